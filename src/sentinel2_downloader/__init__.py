@@ -1,5 +1,7 @@
 from .downloader import get_sentinel2_image
 from .downloader import save_image
 from .utils.geometry import crop_image_to_bbox
+from .utils.geometry import make_cropper
 from .utils.geometry import delta_km_to_deg
+from .utils.geometry import delta_km_to_deg_arr
 from .utils.geometry import reproject_bounds
\ No newline at end of file
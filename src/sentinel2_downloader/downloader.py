@@ -1,55 +1,169 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
-import io
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 from tqdm import tqdm
 from shapely.geometry import box
 from shapely import Polygon
-from pystac_client import Client
 import numpy as np
 import planetary_computer
 
 import rasterio
 from rasterio.io import MemoryFile
 from rasterio.warp import transform_bounds
+from rasterio.windows import from_bounds
+from rasterio.enums import Resampling, Compression
+from rasterio.shutil import copy as rio_copy
+from rasterio.transform import Affine
 from dateutil.parser import isoparse
-from rio_tiler.io import Reader
 import argparse
 
 from sentinel2_downloader.utils.geometry import delta_km_to_deg
-from sentinel2_downloader.utils.metadata import change_arr
+from sentinel2_downloader.utils.metadata import change_arr, RasterChunk
 from sentinel2_downloader.utils.exceptions import NoImagesFoundError
+from sentinel2_downloader.utils.api import get_client_from_api
+from sentinel2_downloader.utils.cache import query_key, load_item_collection, save_item_collection
+
+# Shared session so connections are kept alive and reused across bands and items
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+))
+
+# GDAL options applied around the /vsicurl/ reads of download_bbox: no directory listings,
+# a shared block cache and HTTP/2 multiplexing
+_GDAL_ENV = {
+    "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+    "CPL_VSIL_CURL_ALLOWED_EXTENSIONS": ".tif",
+    "VSI_CACHE": "TRUE",
+    "VSI_CACHE_SIZE": "536870912",  # 512 MB
+    "GDAL_HTTP_VERSION": "2TLS",
+    "GDAL_HTTP_MULTIPLEX": "YES",
+}
+
+# Creation options for written GeoTIFFs: tiled and deflate-compressed, encoded on all cores
+_GTIFF_OPTIONS = {
+    "driver": "GTiff",
+    "tiled": True,
+    "blockxsize": 512,
+    "blockysize": 512,
+    "compress": "deflate",
+    "predictor": 2,
+    "BIGTIFF": "IF_SAFER",
+    "num_threads": "ALL_CPUS",
+}
+
+def _single_get(url, session, verbose=False):
+    """
+    Downloads a file with a single streamed GET request.
+
+    Args:
+        url (str): The URL to download the data from.
+        session (requests.Session): Session used for the request.
+        verbose (bool, optional): If True, displays a progress bar during the download. Defaults to False.
+
+    Returns:
+        MemoryFile: The downloaded file.
+    """
+    block_size = 8 * 1024 * 1024  # 8 MB
+    # Chunks are streamed straight into GDAL's /vsimem/
+    memfile = MemoryFile()
+
+    with session.get(url, stream=True) as response:
+        if verbose:
+            total_size = int(response.headers.get("content-length", 0))
+            t = tqdm(total=total_size, unit='B', unit_scale=True)
+            for data in response.iter_content(block_size):
+                memfile.write(data)
+                t.update(len(data))
+            t.close()
+        else:
+            # Without a progress bar the raw stream is copied in large reads
+            response.raw.decode_content = True
+            shutil.copyfileobj(response.raw, memfile, length=16 * 1024 * 1024)
 
-def download(url, verbose=False):
+    return memfile
+
+def _get_range(url, session, view, lo, hi, progress):
+    """
+    Downloads the byte range [lo, hi] of a file into `view`.
+
+    Returns:
+        bool: False if the server did not honour the Range header or sent a different number of bytes.
+    """
+    block_size = 8 * 1024 * 1024  # 8 MB
+    with session.get(url, headers={'Range': f'bytes={lo}-{hi}'}, stream=True) as response:
+        if response.status_code != 206:
+            return False
+        offset = 0
+        for data in response.iter_content(block_size):
+            end = offset + len(data)
+            if end > len(view):
+                return False
+            view[offset:end] = data
+            offset = end
+            progress.update(len(data))
+    # A short body would leave a zero-filled gap in the file
+    return offset == len(view)
+
+def _parallel_get(url, session, n=4, verbose=False):
+    """
+    Downloads a file using `n` concurrent HTTP Range requests, which avoids being bottlenecked
+    by the throughput of a single connection. Falls back to a single GET if the size of the file
+    is unknown or the server does not support Range requests.
+
+    Args:
+        url (str): The URL to download the data from.
+        session (requests.Session): Session used for the requests.
+        n (int, optional): Number of concurrent Range requests. Defaults to 4.
+        verbose (bool, optional): If True, displays a progress bar during the download. Defaults to False.
+
+    Returns:
+        MemoryFile: The downloaded file.
+    """
+    head = session.head(url, allow_redirects=True)
+    total_size = int(head.headers.get("content-length", 0))
+    if not head.ok or total_size == 0:
+        return _single_get(url, session, verbose=verbose)
+
+    buf = bytearray(total_size)
+    view = memoryview(buf)
+    step = -(-total_size // n)
+    ranges = [(lo, min(lo + step, total_size) - 1) for lo in range(0, total_size, step)]
+
+    with tqdm(total=total_size, unit='B', unit_scale=True, disable=not verbose) as progress:
+        with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+            futures = [executor.submit(_get_range, url, session, view[lo:hi + 1], lo, hi, progress) for lo, hi in ranges]
+            complete = all(future.result() for future in futures)
+
+    if not complete:
+        return _single_get(url, session, verbose=verbose)
+
+    return MemoryFile(view)
+
+def download(url, verbose=False, session=None):
     """
     Downloads data from a given URL and returns it as a NumPy array.
     Args:
         url (str): The URL to download the data from.
         verbose (bool, optional): If True, displays a progress bar during the download. Defaults to False.
+        session (requests.Session, optional): Session used for the request. Defaults to the module-level pooled session.
     Returns:
         list: A list containing the downloaded images as a list of NumPy arrays.
         list: A list of MemoryFile objects containing the downloaded images.
     Raises:
         Exception: If the date of the image cannot be parsed to be included in the image suffix tag.
     """
-    response = requests.get(url, stream=True)
-    total_size = int(response.headers.get("content-length", 0))
-    block_size = 1024 * 1024  # 1 MB
-    buffer = io.BytesIO()
+    session = session or _SESSION
+    memfile = _parallel_get(url, session, verbose=verbose)
 
-    if verbose:
-        t = tqdm(total=total_size, unit='B', unit_scale=True)
-        for data in response.iter_content(block_size):
-            buffer.write(data)
-            t.update(len(data))
-        t.close()
-    else:
-        for data in response.iter_content(block_size):
-            buffer.write(data)
-
-    buffer.seek(0)
-    
-    with rasterio.open(buffer) as src:
+    with memfile, memfile.open() as src:
 
         band = src.read(1)
         meta = src.meta.copy()
@@ -58,37 +172,48 @@ def download(url, verbose=False):
 
     return band, meta, transform, crs
 
-def download_bbox(url, bounds, max_size=512):
+def download_bbox(url, bounds, max_size=None):
     """
     Downloads only the spatial bounding box from a COG using HTTP Range requests.
 
     Args:
         url (str): URL to the COG file (e.g., Sentinel-2 band URL).
-        bounds (tuple): (minx, miny, maxx, maxy) in image CRS (usually EPSG:4326 for STAC assets).
-        max_size (int): Maximum pixel size for output image (preserves aspect ratio).
+        bounds (tuple): (minx, miny, maxx, maxy) in EPSG:4326.
+        max_size (int or None): Maximum pixel size for output image (preserves aspect ratio). If None, the native resolution is kept.
 
     Returns:
         tuple: (band_data, meta, transform, crs)
     """
-    with Reader(url) as cog:
-        # Fix if VRT start acting weird 
-        # from rasterio.warp import transform_bounds
-        # bounds = transform_bounds(4326, cog.crs, *bounds)
-        # img = cog.part(bounds, dst_crs=cog.crs, bounds_crs=cog.crs)
+    with rasterio.Env(**_GDAL_ENV), rasterio.open(f"/vsicurl/{url}") as src:
+        bounds_xy = transform_bounds("EPSG:4326", src.crs, *bounds)
+        window = from_bounds(*bounds_xy, transform=src.transform).round_offsets().round_lengths()
+        transform = src.window_transform(window)
+
+        out_shape = None
+        if max_size is not None and max(window.width, window.height) > max_size:
+            scale = max_size / max(window.width, window.height)
+            out_shape = (max(1, round(window.height * scale)), max(1, round(window.width * scale)))
+            transform = transform * Affine.scale(window.width / out_shape[1], window.height / out_shape[0])
+
+        band = src.read(
+            1,
+            window=window,
+            out_shape=out_shape,
+            resampling=Resampling.bilinear,
+            boundless=True,
+            fill_value=src.nodata or 0
+        )
 
-        img = cog.part(bounds, dst_crs=cog.crs, bounds_crs="EPSG:4326")
-        band = img.data[0]
-
-        meta = cog.dataset.meta.copy()
+        meta = src.meta.copy()
         meta.update({
             "height": band.shape[0],
             "width": band.shape[1],
-            "transform": img.transform,
+            "transform": transform,
             "count": 1
         })
-        return band, meta, meta["transform"], cog.crs
+        return band, meta, transform, src.crs
 
-def get_sentinel2_image(lat, lon, cloud_cover=20, date_range=("2024-01-01", "2024-03-01"), bbox_delta=2, verbose=False, api='microsoft', bbox=None, bands=['B04', 'B03', 'B02'], full=False, superres=False):
+def get_sentinel2_image(lat, lon, cloud_cover=20, date_range=("2024-01-01", "2024-03-01"), bbox_delta=2, verbose=False, api='microsoft', bbox=None, bands=['B04', 'B03', 'B02'], full=False, superres=False, cache_dir=None, return_arrays=True, quantize=None):
     """
     Downloads Sentinel-2 images for a given latitude and longitude, with options for cloud cover, date range, and bounding box size.
     
@@ -104,22 +229,26 @@ def get_sentinel2_image(lat, lon, cloud_cover=20, date_range=("2024-01-01", "202
         bands (list): List of bands to download. Default is ['B04', 'B03', 'B02'].
         full (bool): If True, downloads the full image; if False, downloads only the bounding box.
         superres (bool): If True, applies super-resolution to the downloaded images. BEWARE: This requires the `sentinel2_superres` package to be installed. Additionally, the resulting image will be RGB.
+        cache_dir (str or None): Directory used to cache STAC search results for an hour. If None, every call queries the API.
+        return_arrays (bool): If False, the downloaded arrays are not kept and an empty list is returned in their place, which lowers peak memory when only the MemoryFiles are needed.
+        quantize (str or None): If 'uint8', each image is stretched between its 2nd and 98th percentiles and stored as uint8, halving its size. Meant for visualization outputs. If None, the reflectance values are kept.
 
     Returns:
         tuple: A list of downloaded images as NumPy arrays and a list of MemoryFile objects containing the downloaded images.
     """
 
+    if quantize not in (None, 'uint8'):
+        raise ValueError("Unsupported quantization. Use None or 'uint8'.")
+    if quantize and superres:
+        raise ValueError("Super-resolution requires reflectance values and cannot be combined with quantization.")
+
     # api logic
     file_suffix = bands # To use as output file suffixes, need to get the band names before potential changes
 
     
 
-    if api == 'microsoft':
-        API_URL = "https://planetarycomputer.microsoft.com/api/stac/v1"
-        client = Client.open(API_URL, modifier=planetary_computer.sign_inplace)
-    elif api == 'element84':
-        API_URL = "https://earth-search.aws.element84.com/v1"
-        client = Client.open(API_URL)
+    client = get_client_from_api(api)
+    if api == 'element84':
         # Element84 uses different band names, so we need to map them
         # to the standard Sentinel-2 band names for consistency
         band_names = {
@@ -154,7 +283,8 @@ def get_sentinel2_image(lat, lon, cloud_cover=20, date_range=("2024-01-01", "202
         if not isinstance(bbox, Polygon):
             bbox = box(*bbox)
     
-    arr_list, memfiles = _get_sentinel2_image(cloud_cover, date_range, verbose, bbox, bands, client=client, file_suffix=file_suffix, full=full)
+    # Super-resolution replaces the arrays, so the bands are kept as RasterChunks until upscaled
+    arr_list, memfiles = _get_sentinel2_image(cloud_cover, date_range, verbose, bbox, bands, client=client, file_suffix=file_suffix, full=full, cache_dir=cache_dir, return_arrays=return_arrays or superres, quantize=quantize, as_chunks=superres)
 
     if superres:
         import sentinel2_downloader.utils.superres as sr
@@ -167,103 +297,206 @@ def get_sentinel2_image(lat, lon, cloud_cover=20, date_range=("2024-01-01", "202
 
         # Create a list of array where each elements is a band of the super-resolved image at a specific date
         arr_list = list(arr_sr.reshape(-1, *arr_sr.shape[2:]))
+        # The chunks get the upscaled arrays and are encoded to MemoryFiles
         memfiles = change_arr(memfiles, arr_list)
 
+        if not return_arrays:
+            arr_list = []
+
     return arr_list, memfiles
 
-def _get_sentinel2_image(cloud_cover, date_range, verbose, bbox, bands, client, file_suffix, full):
-    
-    # Search for images containing the bouding box using the STAC API
+def _date_suffix(datetime_str):
+    """
+    Formats a STAC datetime string as the `_YYYY_MM_DD` suffix used in output file names.
+    """
+    # STAC datetimes are RFC 3339 strings, so the date can be sliced without a full parse
+    y, m, d = datetime_str[0:4], datetime_str[5:7], datetime_str[8:10]
+    if len(datetime_str) >= 10 and datetime_str[4] == datetime_str[7] == '-' and (y + m + d).isdigit():
+        return f'_{y}_{m}_{d}'
+
+    date = isoparse(datetime_str)
+    return f'_{date.year}_{date.month:02d}_{date.day:02d}'
+
+def _search_items(client, bbox, cloud_cover, date_range, cache_dir=None):
+    # Search for images containing the bouding box using the STAC API, reusing a recent identical search if cached
+    collection = "sentinel-2-l2a"
+    if cache_dir is not None:
+        key = query_key(client.get_self_href(), collection, bbox.wkb, cloud_cover, tuple(date_range))
+        items = load_item_collection(cache_dir, key)
+        if items is not None:
+            return items
+
     search = client.search(
-        collections=["sentinel-2-l2a"],
+        collections=[collection],
         intersects=bbox,
         query={"eo:cloud_cover": {"lt": cloud_cover}},
         datetime=f"{date_range[0]}/{date_range[1]}"
     )
     items = search.item_collection()
-    if not items or len(items) == 0:
-        raise NoImagesFoundError('No suitable satellite images found in those dates')
 
-    if verbose:
-        print(f"Found {len(items)} images matching the criteria.")
-        for item in items:
-            print(f"Image ID: {item.id}, Cloud Cover: {item.properties['eo:cloud_cover']}%, Date: {item.properties['datetime']}")
+    if cache_dir is not None and len(items) > 0:
+        save_item_collection(cache_dir, key, items)
+    return items
+
+def _to_uint8(arr, nodata=None):
+    """
+    Stretches an array between its 2nd and 98th percentiles into the uint8 range, for visualization outputs.
+    Valid pixels are mapped to 1..255 and only nodata pixels are set to 0, the nodata value of the output.
+    """
+    out = np.zeros(arr.shape, dtype=np.uint8)
+    valid = arr != nodata if nodata is not None else np.ones(arr.shape, dtype=bool)
+    if not valid.any():
+        return out
+
+    # The percentiles ignore nodata so that partial tiles are not stretched towards their empty areas
+    values = arr[valid].astype(np.float32)
+    lo, hi = np.percentile(values, [2, 98])
+    scale = 254.0 / (hi - lo) if hi > lo else 0.0
+    out[valid] = np.clip((values - lo) * scale, 0, 254).astype(np.uint8) + 1
+    return out
+
+def _process_item(item, bands, file_suffix, fetch, executor, return_arrays=True, quantize=None, as_chunks=False):
+    """
+    Downloads the requested bands of a STAC item and writes them to MemoryFiles.
+
+    Args:
+        item (pystac.Item): The STAC item to process.
+        bands (list): Asset names of the bands to download.
+        file_suffix (list): Band names used in the output tags and file suffixes.
+        fetch (callable): Function downloading a band from its href, either `download` or `download_bbox`.
+        executor (ThreadPoolExecutor): Executor the band downloads are submitted to.
+        return_arrays (bool): If False, the downloaded arrays are not returned.
+        quantize (str or None): If 'uint8', the images are stretched and stored as uint8.
+        as_chunks (bool): If True, RasterChunks are returned instead of MemoryFiles and nothing is encoded.
 
+    Returns:
+        tuple: A list of NumPy arrays and a list of MemoryFile (or RasterChunk) objects for this item.
+    """
     memfile_list = []
     arr_list = []
 
-    
-    for item in tqdm(items, desc="Processing Items", leave=False, disable=not verbose):
-        assets = item.assets
-        bands_data = []
-
-        for band in bands:
-            link = assets[band].href
-            if link is None:
-                print(f"Band {band} not found in item {item.id}. Skipping this item.")
-                break
-            else:
-                if full:
-                # Download the full image
-                    b, meta_b, transform, crs = download(link, verbose=verbose)
-                else:
-                # Download only the bounding box
-                    b, meta_b, transform, crs = download_bbox(link, bbox.bounds)
-                bands_data.append([b, meta_b, transform, crs])
-                
-
-        if bands == ['B04', 'B03', 'B02'] or bands == ['red', 'green', 'blue']:
-            r = bands_data[0][0]  # Red band
-            g = bands_data[1][0]  # Green band
-            b = bands_data[2][0]  # Blue band
-            rgb = np.stack([r, g, b], axis=0)
-
-            meta_b.update({
-                "count": 3,
-                "dtype": rgb.dtype,
-                "driver": "GTiff",
-                "transform": transform,
-                "crs": crs
-            })
+    assets = item.assets
+    # Only the requested assets are signed, hrefs outside the Planetary Computer are returned untouched
+    links = [planetary_computer.sign(assets[band].href) if band in assets else None for band in bands]
+
+    if None in links:
+        print(f"Band {bands[links.index(None)]} not found in item {item.id}. Skipping this item.")
+        return arr_list, memfile_list
+
+    date_suffix = _date_suffix(item.properties["datetime"])
+
+    if bands == ['B04', 'B03', 'B02'] or bands == ['red', 'green', 'blue']:
+        bands_data = list(executor.map(fetch, links))
+        _, meta_b, transform, crs = bands_data[0]
+        rgb = np.stack([data[0] for data in bands_data])
+        if quantize == 'uint8':
+            rgb = _to_uint8(rgb, meta_b.get("nodata"))
+            if meta_b.get("nodata") is not None:
+                meta_b["nodata"] = 0
+
+        if return_arrays:
+            arr_list.append(rgb)
+        if as_chunks:
+            memfile_list.append(RasterChunk(rgb, transform, crs, meta_b.get("nodata")))
+            return arr_list, memfile_list
+
+        meta_b.update({
+            "count": 3,
+            "dtype": rgb.dtype,
+            "transform": transform,
+            "crs": crs,
+            **_GTIFF_OPTIONS
+        })
+
+        memfile = MemoryFile()
+        with memfile.open(**meta_b) as dst:
+            dst.write(rgb)
+
+            dst.update_tags(
+                Title="Sentinel-2 RGB Composite",
+                CloudCover=item.properties["eo:cloud_cover"],
+                Date=item.properties["datetime"],
+                Suffix=f'{date_suffix}_RGB',
+                Platform=item.properties.get("platform", "Sentinel-2")
+            )
+        memfile_list.append(memfile)
+
+    else:
+        bands_data = executor.map(fetch, links)
+        for data, band_name in zip(bands_data, file_suffix):
+            b = data[0]
+            meta_b = data[1]
+            transform = data[2]
+            crs = data[3]
+            if quantize == 'uint8':
+                b = _to_uint8(b, meta_b.get("nodata"))
+                if meta_b.get("nodata") is not None:
+                    meta_b["nodata"] = 0
+
+            if return_arrays:
+                arr_list.append(b)
+            if as_chunks:
+                memfile_list.append(RasterChunk(b, transform, crs, meta_b.get("nodata")))
+                continue
 
             memfile = MemoryFile()
-            with memfile.open(**meta_b) as dst:
-                dst.write(rgb[0], 1)
-                dst.write(rgb[1], 2)
-                dst.write(rgb[2], 3)
+            with memfile.open(**{**meta_b, **_GTIFF_OPTIONS, "dtype": b.dtype}) as dst:
+                dst.write(b, 1)
 
-                date = isoparse(item.properties["datetime"])
                 dst.update_tags(
-                    Title="Sentinel-2 RGB Composite",
+                    Title=f"Sentinel-2 {band_name} Band",
                     CloudCover=item.properties["eo:cloud_cover"],
                     Date=item.properties["datetime"],
-                    Suffix=f'_{date.year}_{date.month:02d}_{date.day:02d}_RGB',
+                    Suffix=f'{date_suffix}_{band_name}',
                     Platform=item.properties.get("platform", "Sentinel-2")
                 )
             memfile_list.append(memfile)
-            arr_list.append(rgb)
 
-        else:
-            for data, band_name in zip(bands_data, file_suffix):
-                b = data[0]
-                meta_b = data[1]
-                transform = data[2]
-                crs = data[3]
-
-                memfile = MemoryFile()
-                with memfile.open(**meta_b) as dst:
-                    dst.write(b, 1)
-
-                    date = isoparse(item.properties["datetime"])
-                    dst.update_tags(
-                        Title=f"Sentinel-2 {band_name} Band",
-                        CloudCover=item.properties["eo:cloud_cover"],
-                        Date=item.properties["datetime"],
-                        Suffix=f'_{date.year}_{date.month:02d}_{date.day:02d}_{band_name}',
-                        Platform=item.properties.get("platform", "Sentinel-2")
-                    )
-                memfile_list.append(memfile)
-                arr_list.append(b)
+    return arr_list, memfile_list
+
+def _get_sentinel2_image(cloud_cover, date_range, verbose, bbox, bands, client, file_suffix, full, cache_dir=None, return_arrays=True, quantize=None, as_chunks=False):
+
+    items = _search_items(client, bbox, cloud_cover, date_range, cache_dir=cache_dir)
+    if not items or len(items) == 0:
+        raise NoImagesFoundError('No suitable satellite images found in those dates')
+    # The same scene can be returned more than once, e.g. when paginated results shift between pages,
+    # so duplicates are dropped before anything is downloaded
+    items = list({item.id: item for item in items}.values())
+
+    if verbose:
+        print(f"Found {len(items)} images matching the criteria.")
+        for item in items:
+            print(f"Image ID: {item.id}, Cloud Cover: {item.properties['eo:cloud_cover']}%, Date: {item.properties['datetime']}")
+
+    memfile_list = []
+    arr_list = []
+
+    if full:
+        fetch = partial(download, verbose=verbose)
+        # Full tiles are a few hundred MB per band, so fewer items are kept in flight
+        item_workers = min(2, len(items))
+    else:
+        fetch = partial(download_bbox, bounds=bbox.bounds)
+        item_workers = min(8, len(items))
+
+    # Items run on their own executor and fetch their bands through a shared one,
+    # so an item waiting on its bands never blocks a band worker
+    with ThreadPoolExecutor(max_workers=min(item_workers * len(bands), 16)) as band_executor, \
+            ThreadPoolExecutor(max_workers=item_workers) as item_executor:
+        process = partial(
+            _process_item,
+            bands=bands,
+            file_suffix=file_suffix,
+            fetch=fetch,
+            executor=band_executor,
+            return_arrays=return_arrays,
+            quantize=quantize,
+            as_chunks=as_chunks
+        )
+        results = item_executor.map(process, items)
+        for item_arrs, item_memfiles in tqdm(results, total=len(items), desc="Processing Items", leave=False, disable=not verbose):
+            arr_list.extend(item_arrs)
+            memfile_list.extend(item_memfiles)
 
     return arr_list, memfile_list
 
@@ -276,19 +509,22 @@ def save_image(memfile, path, verbose=False):
         path (str): The path where the image will be saved.
     """
     with memfile.open() as src:
-        if src.tags().get('Suffix'):
-            with rasterio.open(path[:-4] + src.tags().get('Suffix') + '.tif', 'w', **src.meta) as dst:
-                
-                dst.write(src.read())
-                dst.update_tags(**src.tags())
-            if verbose:
-                print(f"Image saved to {path[:-4] + src.tags().get('Suffix') + '.tif'}")
-        else:
-            with rasterio.open(path, 'w', **src.meta) as dst:
-                dst.write(src.read())
-                dst.update_tags(**src.tags())
-                if verbose:
-                    print(f"Image saved to {path}")
+        suffix = src.tags().get('Suffix')
+        encoded = src.profile.get('tiled', False) and src.compression == Compression.deflate
+    if suffix:
+        path = path[:-4] + suffix + '.tif'
+
+    if encoded:
+        # The MemoryFile already holds a tiled and compressed GeoTIFF with its tags, so its bytes are copied as is
+        memfile.seek(0)
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(memfile, f)
+    else:
+        # Otherwise GDAL re-encodes it block by block, without loading the whole array in memory
+        rio_copy(memfile.name, path, **_GTIFF_OPTIONS)
+
+    if verbose:
+        print(f"Image saved to {path}")
 
 
 def parse_args():
@@ -303,6 +539,8 @@ def parse_args():
     parser.add_argument('--verbose', action='store_true', help="Enable verbose output during download", default=False)
     parser.add_argument('--api', type=str, choices=['microsoft', 'element84'], default='microsoft', help="API to use for downloading Sentinel-2 images (default: microsoft)")
     parser.add_argument('--full', action='store_true', help="Download full images instead of just the bounding box")
+    parser.add_argument('--cache_dir', type=str, default=None, help="Directory used to cache STAC search results for an hour")
+    parser.add_argument('--quantize', type=str, choices=['uint8'], default=None, help="Stretch the images to uint8 for visualization, halving their size")
     parser.add_argument('--sr', action='store_true', help="Applies super-resolution to the downloaded images. BEWARE: This requires the `sentinel2_superres` package to be installed. Additionally, the resulting image will be RGB. Only works if bands are B02, B03, B04, B08", default=False)
     return parser.parse_args()
 
@@ -319,10 +557,12 @@ if __name__ == "__main__":
     bands = args.bands
     full = args.full
     superres = args.sr
+    cache_dir = args.cache_dir
+    quantize = args.quantize
 
     bbox_delta = delta_km_to_deg(latitude, bbox_delta[0], bbox_delta[1])
     bbox = (longitude - bbox_delta[0], latitude - bbox_delta[1], longitude + bbox_delta[0], latitude + bbox_delta[1])
-    _, memfile = get_sentinel2_image(latitude, longitude, cloud_cover, date_range, verbose=verbose, bbox=bbox, bands=bands, api=api, full=full, superres=superres)
+    _, memfile = get_sentinel2_image(latitude, longitude, cloud_cover, date_range, verbose=verbose, bbox=bbox, bands=bands, api=api, full=full, superres=superres, cache_dir=cache_dir, return_arrays=False, quantize=quantize)
 
     if output_dir and memfile is not None:
         output_dir = output_dir.replace(' ', '_')
@@ -1,3 +1,5 @@
 from .geometry import crop_image_to_bbox
+from .geometry import make_cropper
 from .geometry import delta_km_to_deg
+from .geometry import delta_km_to_deg_arr
 from .geometry import reproject_bounds
\ No newline at end of file
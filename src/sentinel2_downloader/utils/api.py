@@ -1,9 +1,12 @@
+from functools import lru_cache
+
 from pystac_client import Client
-import planetary_computer
 
+@lru_cache(maxsize=4)
 def get_client_from_api(api='microsoft'):
     """
-    Get the client object for the specified API.
+    Get the client object for the specified API. Clients are cached, so the landing page and
+    conformance classes are only fetched on the first call for each API.
 
     Args:
         api (str): The API to use ('microsoft' or 'element84').
@@ -13,7 +16,8 @@ def get_client_from_api(api='microsoft'):
     """
     if api == 'microsoft':
         API_URL = "https://planetarycomputer.microsoft.com/api/stac/v1"
-        return Client.open(API_URL, modifier=planetary_computer.sign_inplace)
+        # Callers sign the asset hrefs they download
+        return Client.open(API_URL)
     elif api == 'element84':
         API_URL = "https://earth-search.aws.element84.com/v1"
         return Client.open(API_URL)
@@ -0,0 +1,56 @@
+import hashlib
+import json
+import os
+import time
+
+from pystac import ItemCollection
+
+# Search results are only reused for an hour so that newly ingested scenes show up
+EXPIRE_AFTER = 3600
+
+def query_key(*parts):
+    """
+    Build a stable cache key from the parameters of a STAC search.
+
+    Args:
+        *parts: Values identifying the search (API URL, geometry, dates, cloud cover, ...).
+
+    Returns:
+        str: Hex digest identifying the search.
+    """
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+def load_item_collection(cache_dir, key, expire_after=EXPIRE_AFTER):
+    """
+    Load a cached STAC item collection.
+
+    Args:
+        cache_dir (str): Directory holding the cached search results.
+        key (str): Cache key returned by `query_key`.
+        expire_after (int): Age in seconds after which a cached result is ignored.
+
+    Returns:
+        ItemCollection: The cached items, or None if there is no fresh entry for this key.
+    """
+    path = os.path.join(cache_dir, f"{key}.json")
+    if not os.path.exists(path) or time.time() - os.path.getmtime(path) > expire_after:
+        return None
+
+    with open(path) as f:
+        return ItemCollection.from_dict(json.load(f))
+
+def save_item_collection(cache_dir, key, items):
+    """
+    Save a STAC item collection to the cache.
+
+    Args:
+        cache_dir (str): Directory holding the cached search results.
+        key (str): Cache key returned by `query_key`.
+        items (ItemCollection): The items to cache. They should not be signed, as signatures expire.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{key}.json")
+    # Write to a temporary file first so concurrent runs never read a partial entry
+    with open(f"{path}.{os.getpid()}.tmp", "w") as f:
+        json.dump(items.to_dict(), f)
+    os.replace(f"{path}.{os.getpid()}.tmp", path)
@@ -1,73 +1,136 @@
 from shapely.geometry import box
 import numpy as np
 import io
-from math import cos, radians
+from functools import lru_cache
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 import rasterio
-from rasterio.warp import transform_bounds
-from rasterio.windows import Window
+from rasterio.enums import Resampling
+from rasterio.transform import Affine
+from rasterio.windows import Window, from_bounds
+from rasterio.errors import WindowError
 from rasterio.crs import CRS
 from pyproj import Transformer
 
+# Largest geographic box, in degrees, reprojected from its corners only
+_MAX_CORNER_SPAN_DEG = 1.0
+
 def crop_image_to_bbox(
     image_path,
     input_bbox,
     output_path,
-    source_crs: str = 'EPSG:4326'  # Default to GPS coordinates
+    source_crs: str = 'EPSG:4326',  # Default to GPS coordinates
+    max_dim: int = None  # Largest output side in pixels, None keeps the native resolution
 ):
-    with rasterio.open(image_path) as src:
-        image_crs = src.crs
-        image_bounds = src.bounds
-        pixel_width, pixel_height = src.res
+    with make_cropper(image_path, source_crs) as crop:
+        crop(input_bbox, output_path, max_dim)
+
 
-        image_crs_obj = CRS.from_user_input(image_crs)
+@contextmanager
+def make_cropper(image_path, source_crs: str = 'EPSG:4326'):
+    """
+    Open an image once to crop many bounding boxes out of it.
+
+    Args:
+        image_path (str): Path or URL of the image to crop.
+        source_crs (str): CRS of the bounding boxes passed to the cropper.
+
+    Yields:
+        function: `crop(bbox, output_path, max_dim=None)`, taking the same arguments as `crop_image_to_bbox`.
+    """
+    with rasterio.open(image_path) as src:
+        # Everything that only depends on the image is resolved once for all the crops
+        image_crs_obj = CRS.from_user_input(src.crs)
         source_crs_obj = CRS.from_user_input(source_crs)
+        reproject = source_crs_obj != image_crs_obj
+        src_transform = src.transform
+        image_window = Window(0, 0, src.width, src.height)
+        base_profile = src.profile.copy()
+        # GDAL compresses the output blocks on all cores
+        base_profile.update(tiled=True, blockxsize=256, blockysize=256, compress='deflate', num_threads='ALL_CPUS')
 
-        # Transform GPS bbox to image CRS
-        if source_crs_obj != image_crs_obj:
-            reprojected_bbox = transform_bounds(
-                source_crs_obj, image_crs_obj, *input_bbox
-            )
-        else:
-            reprojected_bbox = input_bbox
+        def crop(input_bbox, output_path, max_dim=None):
+            # Transform GPS bbox to image CRS
+            if reproject:
+                reprojected_bbox = _reproject_bbox(input_bbox, source_crs_obj, image_crs_obj)
+            else:
+                reprojected_bbox = input_bbox
 
-        left, bottom, right, top = reprojected_bbox
+            left, bottom, right, top = reprojected_bbox
 
-        # Convert coordinates to pixel offsets
-        col_off = int((left - image_bounds.left) / pixel_width)
-        row_off = int((image_bounds.top - top) / pixel_height)
-        width = int((right - left) / pixel_width)
-        height = int((top - bottom) / pixel_height)
+            # Convert coordinates to a pixel window clipped to the image
+            window = from_bounds(left, bottom, right, top, transform=src_transform).round_offsets().round_lengths()
+            try:
+                window = window.intersection(image_window)
+            except WindowError:
+                raise ValueError("Invalid crop: the bounding box does not overlap the image")
 
-        if width <= 0 or height <= 0:
-            raise ValueError("Invalid crop size: width and height must be > 0")
+            if window.width <= 0 or window.height <= 0:
+                raise ValueError("Invalid crop size: width and height must be > 0")
 
-        # Clamp offsets
-        col_off = max(0, min(col_off, src.width - width))
-        row_off = max(0, min(row_off, src.height - height))
+            out_height, out_width = window.height, window.width
+            if max_dim is not None and max(out_height, out_width) > max_dim:
+                scale = max(out_height, out_width) / max_dim
+                out_height, out_width = max(1, int(out_height / scale)), max(1, int(out_width / scale))
 
-        window = Window(col_off, row_off, width, height)
-        data = src.read(window=window)
+            profile = base_profile.copy()
+            profile.update(
+                height=out_height,
+                width=out_width,
+                transform=src.window_transform(window) * Affine.scale(window.width / out_width, window.height / out_height)
+            )
 
-        profile = src.profile.copy()
-        profile.update(
-            height=height,
-            width=width,
-            transform=src.window_transform(window)
-        )
+            with rasterio.open(output_path, 'w', **profile) as dst:
+                if (out_height, out_width) != (window.height, window.width):
+                    # A decimated read lets GDAL use the overviews of COGs, so only the output size is fetched
+                    dst.write(src.read(window=window, out_shape=(src.count, out_height, out_width), resampling=Resampling.bilinear))
+                else:
+                    # Copy block by block so memory use does not grow with the crop size
+                    blocks = [block for _, block in dst.block_windows(1)]
+                    read_block = lambda block: src.read(window=Window(window.col_off + block.col_off, window.row_off + block.row_off, block.width, block.height))
+                    # The next block is read in the background while the current one is written.
+                    # Writes stay on this thread, a dataset handle cannot be written from several threads
+                    with ThreadPoolExecutor(max_workers=1) as executor:
+                        pending = executor.submit(read_block, blocks[0])
+                        for i, block in enumerate(blocks):
+                            data = pending.result()
+                            if i + 1 < len(blocks):
+                                pending = executor.submit(read_block, blocks[i + 1])
+                            dst.write(data, window=block)
 
-        with rasterio.open(output_path, 'w', **profile) as dst:
-            dst.write(data)
+            print(f"Cropped image saved to: {output_path}")
 
-        print(f"Cropped image saved to: {output_path}")
+        yield crop
 
 
 def delta_km_to_deg(lat, delta_x_km, delta_y_km):
-    delta_lat_deg = delta_y_km / 111.32
-    delta_lon_deg = delta_x_km / (111.32 * cos(radians(lat)))
+    delta_lon_deg, delta_lat_deg = delta_km_to_deg_arr(lat, delta_x_km, delta_y_km)
+    return (float(delta_lon_deg), float(delta_lat_deg))
+
+def delta_km_to_deg_arr(lat, delta_x_km, delta_y_km):
+    # Vectorized over arrays of latitudes, so a grid of tiles is converted in one call
+    delta_lat_deg = np.broadcast_to(np.divide(delta_y_km, 111.32), np.shape(lat))
+    delta_lon_deg = np.divide(delta_x_km, 111.32 * np.cos(np.deg2rad(lat)))
     return (delta_lon_deg, delta_lat_deg)
 
+@lru_cache(maxsize=64)
+def _get_transformer(src_crs, dst_crs):
+    # Building a transformer means creating a PROJ pipeline, so one is kept per CRS pair
+    return Transformer.from_crs(src_crs, dst_crs, always_xy=True)
+
+def _reproject_bbox(bbox, src_crs, dst_crs):
+    transformer = _get_transformer(src_crs, dst_crs)
+    left, bottom, right, top = bbox
+    # Edges of large geographic boxes bend once projected, and boxes crossing the antimeridian
+    # have left > right, so those still go through the densified transform
+    if left > right or dst_crs.is_geographic or (src_crs.is_geographic and max(right - left, top - bottom) > _MAX_CORNER_SPAN_DEG):
+        return transformer.transform_bounds(left, bottom, right, top)
+
+    # For small boxes the four corners are enough
+    xs, ys = transformer.transform(np.array([left, right, right, left]), np.array([bottom, bottom, top, top]))
+    return (float(xs.min()), float(ys.min()), float(xs.max()), float(ys.max()))
+
 def reproject_bounds(bounds, src_crs, dst_crs):
-    transformer = Transformer.from_crs(src_crs, dst_crs, always_xy=True)
-    minx, miny = transformer.transform(bounds[0], bounds[1])
-    maxx, maxy = transformer.transform(bounds[2], bounds[3])
-    return (minx, miny, maxx, maxy)
\ No newline at end of file
+    transformer = _get_transformer(src_crs, dst_crs)
+    xs, ys = transformer.transform(np.array([bounds[0], bounds[2]]), np.array([bounds[1], bounds[3]]))
+    return (float(xs[0]), float(ys[0]), float(xs[1]), float(ys[1]))
\ No newline at end of file
@@ -1,44 +1,123 @@
+import os
+from dataclasses import dataclass
+from functools import partial
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+from rasterio.crs import CRS
 from rasterio.io import MemoryFile
-import rasterio
+from rasterio.transform import Affine
 import numpy as np
 from sentinel2_downloader.utils.geometry import delta_km_to_deg
-from shapely.geometry import box
 from sentinel2_downloader.utils.api import get_client_from_api
 
-def change_arr(memfiles, arr_list):
+# Super-resolved arrays have twice the resolution, so their pixels are half the size
+_HALF_SCALE = Affine.scale(0.5, 0.5)
+
+@dataclass(slots=True)
+class RasterChunk:
+    """
+    An array with the georeferencing needed to write it. Pipeline stages pass these around
+    instead of MemoryFiles, so the array is only encoded to GeoTIFF where a dataset is required.
+    """
+    data: np.ndarray
+    transform: Affine
+    crs: CRS
+    nodata: float | None = None
+
+def to_memfile(chunk):
+    """
+    Encode a RasterChunk into a GeoTIFF MemoryFile.
+
+    Args:
+        chunk (RasterChunk): The chunk to encode. 2D arrays are written as a single band.
+
+    Returns:
+        MemoryFile: The encoded chunk.
+    """
+    data = chunk.data[np.newaxis, ...] if chunk.data.ndim == 2 else chunk.data
+    memfile = MemoryFile()
+    with memfile.open(
+        driver='GTiff',
+        height=data.shape[1],
+        width=data.shape[2],
+        count=data.shape[0],
+        dtype=data.dtype,
+        crs=chunk.crs,
+        transform=chunk.transform,
+        nodata=chunk.nodata
+    ) as dst:
+        dst.write(data)
+    return memfile
+
+def change_arr(memfiles, arr_list, as_memfile=True, reuse_unchanged=False):
     """
     Change the array in the MemoryFile objects without changing the metadata.
 
     Args:
-        memfiles (list): List of MemoryFile objects.
-        arr (numpy.ndarray): The new array to set in the MemoryFile objects.
+        memfiles (list): List of MemoryFile or RasterChunk objects. RasterChunks are updated in place.
+        arr_list (list): The new arrays, one per MemoryFile.
+        as_memfile (bool): If False, RasterChunks are returned instead of new MemoryFile objects, which skips encoding the arrays to GeoTIFF.
+        reuse_unchanged (bool): If True, MemoryFiles whose size already matches the new array are returned as is instead of being rewritten. Only use it when those arrays hold the data already stored in the MemoryFile.
 
     Returns:
-        list: List of MemoryFile objects with updated arrays.
+        list: List of MemoryFile objects with updated arrays, or of RasterChunks if `as_memfile` is False.
     """
 
-    new_memfiles = []
     if isinstance(memfiles[0], list):
         # If memfiles is a list of lists, flatten it
-        memfiles = [item for sublist in memfiles for item in sublist]
-    for memfile, arr in zip(memfiles, arr_list):
+        memfiles = list(chain.from_iterable(memfiles))
+    change = partial(_change_one, as_memfile=as_memfile, reuse_unchanged=reuse_unchanged)
+    if not as_memfile or len(arr_list) < 2:
+        return list(map(change, memfiles, arr_list))
+
+    # GDAL releases the GIL while encoding, so the GeoTIFFs are written concurrently
+    with ThreadPoolExecutor(max_workers=min(os.cpu_count() or 1, len(arr_list))) as executor:
+        return list(executor.map(change, memfiles, arr_list))
+
+def _change_one(memfile, arr, as_memfile, reuse_unchanged):
+    if isinstance(memfile, RasterChunk):
+        chunk = memfile
+        shape = chunk.data.shape[-2:]
+    else:
+        # Only the georeferencing is read from the MemoryFile
         with memfile.open() as src:
-            meta = src.meta.copy()
-            trs = src.transform
-            meta.update({
-                'height': arr.shape[0],
-                'width': arr.shape[1],
-                'transform': rasterio.Affine(trs.a /2, trs.b, trs.c,
-                                            trs.d, trs.e / 2, trs.f),
-            })
+            chunk = RasterChunk(None, src.transform, src.crs, src.nodata)
+            shape = (src.height, src.width)
 
-        new_memfile = MemoryFile()
-        with new_memfile.open(**meta) as dst:
-            dst.write(arr[np.newaxis, ...])
+    # Arrays at the original resolution keep the original geotransform
+    same_shape = arr.shape[-2:] == shape
+    if same_shape and reuse_unchanged and as_memfile and isinstance(memfile, MemoryFile):
+        return memfile
 
-        new_memfiles.append(new_memfile)
+    chunk.data = arr
+    if not same_shape:
+        chunk.transform = chunk.transform * _HALF_SCALE
 
-    return new_memfiles
+    return to_memfile(chunk) if as_memfile else chunk
+
+def _search_dates(client, lat, lon, cloud_cover, date_range, delta):
+    bbox_delta = (delta, delta)
+    bbox_delta = delta_km_to_deg(lat, bbox_delta[0], bbox_delta[1])
+    bbox = [lon - bbox_delta[0], lat - bbox_delta[1], lon + bbox_delta[0], lat + bbox_delta[1]]
+
+    search = client.search(
+        collections=["sentinel-2-l2a"],
+        bbox=bbox,
+        query={"eo:cloud_cover": {"lt": cloud_cover}},
+        datetime=f"{date_range[0]}/{date_range[1]}",
+        # Only the datetimes are needed, so the server is asked to leave out assets, links and geometries
+        fields={
+            "include": ["properties.datetime"],
+            "exclude": ["assets", "links", "geometry", "bbox", "stac_extensions"]
+        }
+    )
+
+    # The datetimes are read from the plain item dicts
+    dates = [item['properties']['datetime'] for item in search.items_as_dicts()]
+    if len(dates) == 0:
+        return None
+    
+    return dates
 
 def get_available_dates(lat, lon, cloud_cover, date_range, delta, api='microsoft'):
     """
@@ -56,26 +135,23 @@ def get_available_dates(lat, lon, cloud_cover, date_range, delta, api='microsoft
         If no images are found, returns None.
     """
 
-    client = get_client_from_api(api)
-
-    bbox_delta = (delta, delta)
-    bbox_delta = delta_km_to_deg(lat, bbox_delta[0], bbox_delta[1])
-    bbox = (lon - bbox_delta[0], lat - bbox_delta[1], lon + bbox_delta[0], lat + bbox_delta[1])
-    bbox = box(*bbox)
-
+    return _search_dates(get_client_from_api(api), lat, lon, cloud_cover, date_range, delta)
 
+def get_available_dates_many(queries, api='microsoft', max_workers=8):
+    """
+    Get the available dates for several locations at once. The searches are network-bound,
+    so they are sent concurrently.
 
-    search = client.search(
-        collections=["sentinel-2-l2a"],
-        intersects=bbox,
-        query={"eo:cloud_cover": {"lt": cloud_cover}},
-        datetime=f"{date_range[0]}/{date_range[1]}"
-    )
+    Args:
+        queries (list): List of (lat, lon, cloud_cover, date_range, delta) tuples, with the same meaning as the arguments of `get_available_dates`.
+        api (str): The API to use ('microsoft' or 'element84').
+        max_workers (int): Maximum number of concurrent searches.
 
-    items = search.item_collection()
-    if not items or len(items) == 0:
-        return None
-    
-    return [item.properties['datetime'] for item in items]
+    Returns:
+        list: For each query, in order, the list of available dates or None if no images are found.
+    """
 
+    client = get_client_from_api(api)
 
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda query: _search_dates(client, *query), queries))
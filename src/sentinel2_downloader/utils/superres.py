@@ -1,9 +1,19 @@
 from sentinel2_superres import upscale
 import numpy as np
 
+try:
+    import cupy as cp
+except ImportError:
+    cp = None
+
 
 def upscale_images(input_arr):
-    input_arr = [np.array(arr) for arr in input_arr]
+    # Arrays already on the GPU stay there
+    xp = cp if cp is not None and all(isinstance(arr, cp.ndarray) for arr in input_arr) else np
+    input_arr = [xp.asarray(arr) for arr in input_arr]
     monodate = len(input_arr) == 1
+    if all(arr.shape == input_arr[0].shape for arr in input_arr):
+        # Same-shape dates are handed over as one contiguous (N, C, H, W) batch
+        input_arr = xp.ascontiguousarray(xp.stack(input_arr))
     results = upscale.upscale(input_arr, monodate=monodate)
-    return results
\ No newline at end of file
+    return results